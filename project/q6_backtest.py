@@ -0,0 +1,246 @@
+"""Shared helpers for the Q6 SOFR futures carry backtests.
+
+The Q6 scripts each carried their own copy of the contract parsing,
+first/second-contract selection and P&L/metric code. This module keeps a
+single vectorized implementation; a script supplies only its hold signal
+(a function of the front and second rate arrays).
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+DV01 = 100 * 25  # $25 per bp, rates quoted in %
+
+MONTH_CODES = {'H': 3, 'M': 6, 'U': 9, 'Z': 12}
+
+
+def sort_contracts(columns):
+    """Return the SR3 tickers from `columns` sorted by expiry.
+
+    Encodes (year, month) from SR3<month letter><year digit> into one
+    integer sort key per ticker in a vectorized pass instead of a Python
+    tuple sort.
+    """
+    contracts = np.array([c for c in columns if c.startswith("SR3")])
+    month_lut = np.zeros(256, dtype=np.int64)
+    for letter, month in MONTH_CODES.items():
+        month_lut[ord(letter)] = month
+    chars = contracts.view('U1').reshape(len(contracts), -1).view(np.uint32)
+    sort_keys = (2020 + (chars[:, 4] - ord('0'))) * 12 + month_lut[chars[:, 3]]
+    return contracts[np.argsort(sort_keys, kind='stable')].tolist()
+
+
+@njit(cache=True)
+def first_two_valid(M):
+    """Early-exit scan for the first two valid columns per row of a
+    (days, contracts) matrix.
+
+    Only a handful of contracts trade at once, so breaking out after the
+    second hit beats building full row-wide masks. Rows with fewer than
+    two valid contracts keep index 0 and must be screened via valid_cnt,
+    which saturates at 2.
+    """
+    n, c = M.shape
+    front_idx = np.zeros(n, dtype=np.int64)
+    second_idx = np.zeros(n, dtype=np.int64)
+    valid_cnt = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+        k = 0
+        for j in range(c):
+            if not np.isnan(M[i, j]):
+                if k == 0:
+                    front_idx[i] = j
+                else:
+                    second_idx[i] = j
+                k += 1
+                if k == 2:
+                    break
+        valid_cnt[i] = k
+    return front_idx, second_idx, valid_cnt
+
+
+@njit(cache=True)
+def roll_state(front_idx, second_idx, hold, valid_cnt):
+    """Sequential roll state over int-coded contracts (-1 means no contract).
+
+    While `hold` stays true the held contract persists, rolling into the
+    new second contract only once the held one becomes the front — the
+    same semantics as the original row-wise loops.
+    """
+    n = front_idx.shape[0]
+    held_id = np.full(n, -1, dtype=np.int32)
+    front_id = np.full(n, -1, dtype=np.int32)
+    position = np.zeros(n, dtype=np.int8)
+    current = -1
+    for i in range(n):
+        if valid_cnt[i] < 2:
+            continue
+
+        if hold[i]:
+            if current == -1 or current == front_idx[i]:
+                current = second_idx[i]
+        else:
+            current = -1  # flat when the signal is off
+
+        if current != -1:
+            held_id[i] = current
+            front_id[i] = front_idx[i]
+            position[i] = 1
+    return held_id, front_id, position
+
+
+@njit(cache=True)
+def compute_metrics(d_held, d_front, position, dv01):
+    """One fused pass over the deltas: pnl, cum pnl, running max, max drawdown,
+    plus the running sums the summary stats are derived from."""
+    n = d_held.shape[0]
+    pnl = np.empty(n)
+    cum_pnl = np.empty(n)
+    running_max = np.empty(n)
+    cum = 0.0
+    peak = 0.0
+    max_dd = 0.0
+    s = 0.0
+    s2 = 0.0
+    s_active = 0.0
+    k_active = 0
+    for i in range(n):
+        # P&L: long held, short front (pass zero front deltas for outright)
+        p = (-d_held[i] + d_front[i]) * dv01
+        cum += p
+        if cum > peak:
+            peak = cum
+        dd = cum - peak
+        if dd < max_dd:
+            max_dd = dd
+        s += p
+        s2 += p * p
+        if position[i] == 1:
+            s_active += p
+            k_active += 1
+        pnl[i] = p
+        cum_pnl[i] = cum
+        running_max[i] = peak
+    return pnl, cum_pnl, running_max, max_dd, s, s2, s_active, k_active
+
+
+def cache_rates(rates, path):
+    """Persist the rates frame so later runs skip the spreadsheet ingest."""
+    rates.to_parquet(path, compression='zstd')
+
+
+def fresh_cache(path, source):
+    """True when the cache at `path` exists and is at least as new as `source`.
+
+    A re-downloaded spreadsheet invalidates the cache via mtime; deleting
+    the parquet file forces a rebuild by hand.
+    """
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(source):
+        return True
+    return os.path.getmtime(path) >= os.path.getmtime(source)
+
+
+def load_rates(path, columns=None):
+    """Load a cached rates frame, optionally projecting columns at file level."""
+    return pd.read_parquet(path, columns=columns)
+
+
+@dataclass
+class BacktestResult:
+    frame: pd.DataFrame
+    cum_pnl: float
+    sharpe: float
+    max_drawdown: float
+    mean_daily_pnl: float
+    std_daily_pnl: float
+    active_days: int
+    avg_active_pnl: float
+
+
+def backtest(rates, signal, short_front=True, zero_roll_days=True):
+    """Backtest a long-2nd-contract strategy over the SR3 rate columns.
+
+    `signal(front_rate, second_rate)` returns a boolean hold array; days
+    with fewer than two live contracts are always flat. The held contract
+    carries over from the previous day, rolling into the new second only
+    when the held one has become the front. With `short_front` the
+    position is long 2nd / short front, otherwise long 2nd outright.
+    P&L is zeroed on roll days unless `zero_roll_days` is off, and scaled
+    by DV01 dollars per bp.
+    """
+    contracts_sorted = sort_contracts(rates.columns)
+    # float32 is ample for rates quoted to ~6 significant digits and halves
+    # the memory traffic of every vector op below
+    frame = rates[contracts_sorted].astype(np.float32)
+    M = frame.to_numpy()
+    n_days = len(frame)
+    rows = np.arange(n_days)
+
+    front_idx, second_idx, valid_cnt = first_two_valid(M)
+    front_rate = M[rows, front_idx]
+    second_rate = M[rows, second_idx]
+
+    hold = np.asarray(signal(front_rate, second_rate), dtype=bool)
+    held_id, front_id, position = roll_state(front_idx, second_idx, hold, valid_cnt)
+    in_pos = position == 1
+
+    held_rate = np.where(in_pos, M[rows, np.where(held_id >= 0, held_id, 0)], np.nan)
+    front_rate_held = np.where(in_pos, front_rate, np.nan)
+
+    # One allocation per delta, first element zero by construction
+    d_held = np.empty_like(held_rate)
+    d_held[0] = 0.0
+    np.subtract(held_rate[1:], held_rate[:-1], out=d_held[1:])
+    d_front = np.empty_like(front_rate_held)
+    d_front[0] = 0.0
+    np.subtract(front_rate_held[1:], front_rate_held[:-1], out=d_front[1:])
+
+    if zero_roll_days:
+        # 0 p&l on roll days (held contract changes) and days with no position
+        roll_days = np.empty(n_days, dtype=bool)
+        roll_days[0] = True
+        roll_days[1:] = held_id[1:] != held_id[:-1]
+        d_held = np.where(roll_days | np.isnan(d_held), 0.0, d_held)
+        d_front = np.where(roll_days | np.isnan(d_front), 0.0, d_front)
+    else:
+        # only days with no position; cross-contract jumps accrue
+        np.nan_to_num(d_held, copy=False)
+        np.nan_to_num(d_front, copy=False)
+
+    # The outright variant folds into the fused kernel via zero front deltas
+    d_front_pnl = d_front if short_front else np.zeros_like(d_held)
+    (pnl, cum_pnl, running_max, max_dd,
+     pnl_sum, pnl_sumsq, active_pnl_sum, active_days) = compute_metrics(
+        d_held, d_front_pnl, position, DV01)
+    drawdown = cum_pnl - running_max
+
+    # Summary stats straight from the kernel's running sums (mean = s/n and
+    # sample variance = (s2 - s^2/n) / (n-1)); no extra passes over pnl
+    mean_daily_pnl = pnl_sum / n_days
+    var_daily_pnl = (pnl_sumsq - pnl_sum * pnl_sum / n_days) / (n_days - 1)
+    std_daily_pnl = float(np.sqrt(var_daily_pnl))
+    sharpe = float(np.sqrt(252) * mean_daily_pnl / std_daily_pnl)
+    avg_active_pnl = active_pnl_sum / active_days if active_days else 0.0
+
+    # Map int ids back to tickers; id -1 picks the trailing None sentinel
+    labels = np.array(contracts_sorted + [None], dtype=object)
+    frame['held_contract'] = pd.Categorical(labels[held_id], categories=contracts_sorted)
+    frame['front_contract'] = pd.Categorical(labels[front_id], categories=contracts_sorted)
+    frame['position'] = position
+    frame['held_rate'] = held_rate
+    frame['front_rate'] = front_rate_held
+    frame['delta_held'] = d_held
+    frame['delta_front'] = d_front
+    frame['pnl'] = pnl
+    frame['cum_pnl'] = cum_pnl
+    frame['running_max'] = running_max
+    frame['drawdown'] = drawdown
+    return BacktestResult(frame, float(cum_pnl[-1]), sharpe, float(max_dd),
+                          float(mean_daily_pnl), std_daily_pnl,
+                          int(active_days), float(avg_active_pnl))